@@ -5,16 +5,17 @@ import time
 import os
 import json
 import os.path as path
-from typing import List
+from typing import List, FrozenSet
 import string
 import secrets
 import time
 import http.client
 import requests
 import hashlib
+import logging
 from gzip import decompress
+from functools import lru_cache
 
-from urllib.parse import urlsplit
 from datetime import datetime
 from email.mime.image import MIMEImage
 
@@ -22,6 +23,14 @@ from core.auth import Authentication
 #import core.schedule as schedule
 
 alphabet = string.ascii_letters + string.digits
+_alphabet_bytes = alphabet.encode("ascii")
+# largest multiple of the alphabet size below 256, random bytes above are rejected to avoid modulo bias
+_alphabet_byte_limit = 256 - 256 % len(_alphabet_bytes)
+
+log = logging.getLogger(__name__)
+
+# shared session so that consecutive Auth0 API calls reuse the same connection
+auth0_session = requests.Session()
 
 
 def format_to_auth0(email, name, password_hash):
@@ -33,28 +42,32 @@ def format_to_auth0(email, name, password_hash):
     }
 
 
-def send_to_auth0(session, filename, access_token, connection_id):
-    payload = {
-        "connection_id": connection_id,
-        "external_id": "import_user",
-        "send_completion_email": False
-    }
-
-    files = {
-        "users": open(filename, "rb")
-    }
-
-    headers = {
-        'authorization': f"Bearer {access_token}"
-    }
-
-    domain = "https://" + \
-        urlsplit(session.auth0["audience"]).netloc + \
-        "/api/v2/jobs/users-imports"
-    print(domain)
-    response = requests.post(domain, data=payload, files=files,
-                             headers=headers)
-    print(response.content)
+def send_to_auth0(session, filename, access_token, connection_id) -> requests.Response:
+    """uploads the users file as auth0 import job, returns the response describing the created job
+    """
+    # only needed for the bulk import, so other users of this module do not require requests_toolbelt
+    from requests_toolbelt import MultipartEncoder
+    domain = session.auth0_import_url
+    log.debug("POST %s", domain)
+    # the users file is streamed as multipart body instead of being read into memory
+    with open(filename, "rb") as f:
+        body = MultipartEncoder(fields={
+            "connection_id": connection_id,
+            "external_id": "import_user",
+            "send_completion_email": "false",
+            "users": (filename, f, "application/json")
+        })
+
+        headers = {
+            'authorization': f"Bearer {access_token}",
+            'content-type': body.content_type
+        }
+        response = auth0_session.post(domain, data=body, headers=headers)
+    if response.ok:
+        log.debug("auth0 response: %s", response.content)
+    else:
+        log.warning("auth0 request failed with status %s: %s", response.status_code, response.content)
+    return response
 
 def retrieve_users_via_export(auth: Authentication, access_token: str) -> List[dict]:
     """Retrieve up to 10,000 auth0 users using the export job functionality
@@ -90,7 +103,7 @@ def retrieve_users_via_export(auth: Authentication, access_token: str) -> List[d
                 """.replace("{conn}", connection)
     url = "https://" + auth.auth0["domain"] + f"/api/v2/jobs/users-exports"
     print(url)
-    exp_response = requests.post(url, data=export_req_body, headers={
+    exp_response = auth0_session.post(url, data=export_req_body, headers={
         **headers, 
         "Content-Type": "application/json"}).json()
     job_id = exp_response["id"]
@@ -98,7 +111,7 @@ def retrieve_users_via_export(auth: Authentication, access_token: str) -> List[d
         time.sleep(2)
         url = "https://" + auth.auth0["domain"] + f"/api/v2/jobs/{job_id}"
         print(url)
-        job_res = requests.get(url, headers=headers).json()
+        job_res = auth0_session.get(url, headers=headers).json()
         status = job_res["status"] if "status" in job_res else "<missing>"
         if status == "pending":
             continue
@@ -133,7 +146,7 @@ def retrieve_users(auth: Authentication, access_token: str) -> List:
             auth.auth0["domain"] + \
             f"/api/v2/users?page={cur_page}&per_page=100&q=identities.connection%3A%22{db}%22&search_engine=v3"
         print(url)
-        response = requests.get(url, headers=headers).json()
+        response = auth0_session.get(url, headers=headers).json()
         if not response or len(response) == 0:
             break
         users.extend(response)
@@ -151,10 +164,13 @@ def user_update_merge_metadata(auth: Authentication, access_token: str, user_id
         'Authorization': f"Bearer {access_token}"
     }
 
-    url = "https://" + auth.auth0["domain"] + "/api/v2/users/" + user_id
-    print(url)
-    response = requests.patch(url, json=payload, headers=headers)
-    print(response.content)
+    url = auth.auth0_users_url + "/" + user_id
+    log.debug("PATCH %s", url)
+    response = auth0_session.patch(url, json=payload, headers=headers)
+    if response.ok:
+        log.debug("auth0 response: %s", response.content)
+    else:
+        log.warning("auth0 request failed with status %s: %s", response.status_code, response.content)
     return response
 
 def send_create_user(auth: Authentication, access_token: str, name: str, email: str, password: str, metadata: dict) -> requests.Response:
@@ -173,10 +189,13 @@ def send_create_user(auth: Authentication, access_token: str, name: str, email:
         'Authorization': f"Bearer {access_token}"
     }
 
-    url = "https://" + auth.auth0["domain"] + "/api/v2/users"
-    print(url)
-    response = requests.post(url, json=payload, headers=headers)
-    print(response.content)
+    url = auth.auth0_users_url
+    log.debug("POST %s", url)
+    response = auth0_session.post(url, json=payload, headers=headers)
+    if response.ok:
+        log.debug("auth0 response: %s", response.content)
+    else:
+        log.warning("auth0 request failed with status %s: %s", response.status_code, response.content)
     return response
 
 
@@ -189,15 +208,15 @@ def create_user(auth: Authentication, access_token: str, email: str, name: str,
 
     send_create_user(auth, access_token, name, email, password, metadata)
 
-def get_any_password_requests():
-    password_requests = []
-    for f in os.listdir("./"):
-        if f.startswith("password_request"):
-            with open(f, "r") as fhandle:
-                for l in fhandle.readlines():
-                    line = l.strip()
-                    if len(line) > 0:
-                        password_requests.append(line)
+def get_any_password_requests() -> FrozenSet[str]:
+    password_requests = set()
+    with os.scandir(".") as it:
+        for entry in it:
+            if not entry.name.startswith("password_request") or not entry.is_file(follow_symlinks=False):
+                continue
+            with open(entry.path, "r") as fhandle:
+                password_requests.update(filter(None, (l.strip() for l in fhandle)))
+    password_requests = frozenset(password_requests)
     print(f"Got password requests {password_requests}")
     return password_requests
 
@@ -237,10 +256,38 @@ def get_new_eventbrite(session):
     return eventbrite_registrations
 
 
+def random_password(length: int = 10) -> str:
+    """generates random password of letters and digits with a single urandom call in the common case
+    """
+    chars = bytearray()
+    while len(chars) < length:
+        chars.extend(_alphabet_bytes[b % len(_alphabet_bytes)]
+                     for b in secrets.token_bytes(2 * length) if b < _alphabet_byte_limit)
+    return chars[:length].decode("ascii")
+
+
+@lru_cache(maxsize=65536)
 def generate_password(email: str, secret: str) -> str:
-    """generates password from email using hash with secret
+    """generates password from email using hash with secret, results are memoized per process
+    """
+    h = hashlib.sha256((email.lower() if email is not None else "").encode('utf-8'))
+    h.update(secret.encode('utf-8'))
+    # only the first 5 bytes (10 hex characters) of the digest are used
+    return h.digest()[:5].hex()
+
+
+def generate_passwords(emails: List[str], secret: str) -> List[str]:
+    """generates passwords for a batch of emails, see generate_password.
+    The secret is only encoded once for the whole batch
     """
-    return hashlib.sha256(((email.lower() if email is not None else "") + secret).encode('utf-8')).hexdigest()[:10]
+    secret_bytes = secret.encode('utf-8')
+    # bind the hash constructor locally to avoid the module lookup per email
+    sha256 = hashlib.sha256
+    hashes = [sha256((email.lower() if email is not None else "").encode('utf-8')) for email in emails]
+    for h in hashes:
+        h.update(secret_bytes)
+    # only the first 5 bytes (10 hex characters) of the digest are used
+    return [h.digest()[:5].hex() for h in hashes]
 
 
 def get_all(transmit_to_auth0, session, logo_attachment, max_new=-1):
@@ -269,8 +316,7 @@ def get_all(transmit_to_auth0, session, logo_attachment, max_new=-1):
             # random password
             password = ""
             if email not in all_registered:
-                password = ''.join(secrets.choice(alphabet)
-                                   for i in range(10)).encode("utf-8")
+                password = random_password(10).encode("utf-8")
             else:
                 password = all_registered[email]["password"].encode("utf-8")
 
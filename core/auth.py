@@ -111,6 +111,10 @@ class Authentication:
             self.eventbrite_token = auth["eventbrite"]
             if "auth0" in auth:
                 self.auth0 = auth["auth0"]
+                self.auth0_users_url = "https://" + self.auth0["domain"] + "/api/v2/users"
+                self.auth0_import_url = "https://" + \
+                    urlsplit(self.auth0["audience"]).netloc + \
+                    "/api/v2/jobs/users-imports"
             if "pmu" in auth:
                 self.pmu = auth["pmu"]
 
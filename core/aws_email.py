@@ -2,6 +2,8 @@
 """
 
 
+import threading
+import time
 from typing import List, Tuple
 from core.auth import Authentication
 from email import encoders
@@ -11,6 +13,36 @@ from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 
 
+class SendRateLimiter:
+    """spaces out send calls so that at most max_send_rate mails are sent per second, can be shared between threads
+    """
+    def __init__(self, max_send_rate : float):
+        self.interval = 1.0 / max_send_rate if max_send_rate > 0 else 0.0
+        self._next_send = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """block until the next mail may be sent
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._next_send > now:
+                time.sleep(self._next_send - now)
+                now = self._next_send
+            self._next_send = now + self.interval
+
+
+def get_send_rate_limiter(session : Authentication, default_rate : float = 2.0) -> SendRateLimiter:
+    """rate limiter based on the account's SES MaxSendRate, default_rate (mails per second) is used if the quota cannot be retrieved
+    """
+    rate = default_rate
+    try:
+        rate = float(session.email.get_send_quota()["MaxSendRate"])
+    except Exception as ex:
+        print(f"could not retrieve SES send quota, using {default_rate} mails/s: {ex}")
+    return SendRateLimiter(rate)
+
+
 def send_aws_email(session : Authentication, sender: str, recipients: List[str], subject : str, body_text : str, body_html : str = None,
                   charset : str = "UTF-8"):
     """send mail using text body and/or html body. .
@@ -66,24 +98,30 @@ def send_aws_email(session : Authentication, sender: str, recipients: List[str],
     )
     return response
 
-def _get_recipients_from_template(row : dict, template : dict) -> Tuple[list,list]:
-    """extract recipient(s) from a single database item and the corresponding template:
-
-    recipients, cc_recipients = _get_recipients_from_template(paper, template)
+def get_recipient_attributes(template : dict) -> List[str]:
+    """valid recipient attribute names of the template, callers that send many mails
+    with the same template can compute them once and pass them to send_aws_email_paper
     """
-    recipients = []
     attribute_arr : List = template["recipient_attributes"] if "recipient_attributes" in template else None
-    if not attribute_arr or len(attribute_arr) == 0:
-        attribute_arr = []
+    # copy so that the template's own list is not extended
+    attribute_arr = list(attribute_arr) if attribute_arr else []
 
     attribute = template["recipient_attribute"] if "recipient_attribute" in template else None
     if attribute and len(attribute) > 0:
         attribute_arr.append(attribute)
-    
-    for att in attribute_arr:
-        if type(att) != str or len(att.strip()) == 0:
-            continue
-        r_str = row[att] if att in row else None
+
+    return [att for att in attribute_arr if type(att) == str and len(att.strip()) > 0]
+
+def _get_recipients_from_template(row : dict, template : dict, recipient_attributes : List[str] = None) -> Tuple[list,list]:
+    """extract recipient(s) from a single database item and the corresponding template:
+
+    recipients, cc_recipients = _get_recipients_from_template(paper, template)
+    """
+    if recipient_attributes is None:
+        recipient_attributes = get_recipient_attributes(template)
+    recipients = []
+    for att in recipient_attributes:
+        r_str = row.get(att)
         if type(r_str) != str:
             continue
         for email in r_str.split("|"):
@@ -91,11 +129,12 @@ def _get_recipients_from_template(row : dict, template : dict) -> Tuple[list,lis
             if len(em) == 0:
                 continue
             recipients.append(em)
-    rec_template = template["recipient"] if "recipient" in template else None
+    rec_template = template.get("recipient")
     if type(rec_template) == str and len(rec_template) > 0:
-        email = rec_template.format(**row).strip()
+        email = rec_template.format_map(row).strip()
         recipients.append(email)
-    return recipients, []
+    #the same person may be listed in several attributes, e.g. as chair and contributor
+    return list(dict.fromkeys(recipients)), []
 
 def send_aws_email_rows(session : Authentication, rows : List[dict], template : dict):
     """send mails to specified recipients of database rows using text body and/or html body.
@@ -122,7 +161,7 @@ def send_aws_email_rows(session : Authentication, rows : List[dict], template :
         row.update(d)
     return send_aws_email_paper(session, row, template)
 
-def send_aws_email_paper(session : Authentication, row : dict, template : dict):
+def send_aws_email_paper(session : Authentication, row : dict, template : dict, recipient_attributes : List[str] = None):
     """send mails to specified recipients of a paper or database row using text body and/or html body.
     Recipients, sender, and mail content will be determined based on specified template dictionary.
     This template dict can use placeholders based on the paper's attributes.
@@ -140,16 +179,17 @@ def send_aws_email_paper(session : Authentication, row : dict, template : dict):
         "body_text": "We regret to inform you that your request for paper {Title} has not been granted",
         "body_html": "<html><head></head><body><h1>Hello</h1><p>We regret to inform you that your request for paper {Title} has not been granted</p></body></html>"
       } 
+    recipient_attributes : result of get_recipient_attributes(template), computed from the template if not given
     """
-    recipients, cc_recipients = _get_recipients_from_template(row, template)
+    recipients, cc_recipients = _get_recipients_from_template(row, template, recipient_attributes)
     if len(recipients) == 0 and len(cc_recipients) == 0:
-        item_id = row['UID'] if 'UID' in row else ''
+        item_id = row.get('UID', '')
         print(f"skipping row {item_id} with zero recipients")
         return
-    sender = template["sender"].format(**row)
-    subject = template["subject"].format(**row)
-    body_text = template["body_text"].format(**row)
-    body_html = template["body_html"].format(**row)
+    sender = template["sender"].format_map(row)
+    subject = template["subject"].format_map(row)
+    body_text = template["body_text"].format_map(row)
+    body_html = template["body_html"].format_map(row)
     return send_aws_email(session, sender, recipients, subject, body_text, body_html)
 
 def send_aws_mime_email(session : Authentication, sender: str, recipients: List[str],
@@ -193,15 +233,20 @@ def send_aws_mime_email(session : Authentication, sender: str, recipients: List[
         all_recipients += [r.strip() for r in cc_recipients]
 
     message["subject"] = subject
-    message_text = MIMEMultipart("alternative")
     if alternative_text:
+        message_text = MIMEMultipart("alternative")
         message_text.attach(MIMEText(alternative_text, "plain", "utf8"))
-    message_text.attach(MIMEText(body, "html", "utf8"))
-    message.attach(message_text)
+        message_text.attach(MIMEText(body, "html", "utf8"))
+        message.attach(message_text)
+    else:
+        #no alternative part needed for a single html body
+        message.attach(MIMEText(body, "html", "utf8"))
 
     if attachments:
         for a in attachments:
-            encoders.encode_base64(a)
+            #parts such as MIMEImage are already encoded
+            if "Content-Transfer-Encoding" not in a:
+                encoders.encode_base64(a)
             message.attach(a)
 
     response = session.email.send_raw_email(
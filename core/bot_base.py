@@ -1,7 +1,7 @@
 import re
 from datetime import timezone, datetime, timedelta
 
-match_zoom_link = re.compile("https:\/\/.*\.zoom\.us\/j\/.*")
+match_zoom_link = re.compile(r"https://.*\.zoom\.us/j/.*")
 
 def parse_youtube_time(time):
     # If a suffix in milliseconds was included, remove it
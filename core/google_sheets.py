@@ -6,16 +6,26 @@ import argparse
 from typing import Any, List
 from datetime import timezone, datetime, timedelta
 import csv
+import io
 import urllib.request
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 import core.auth as conf_auth
 
 
+@lru_cache(maxsize=1)
+def _get_auth() -> conf_auth.Authentication:
+    """authentication shared by all sheets, the auth file is only read once per process
+    """
+    return conf_auth.Authentication()
+
+
 class GoogleSheets:
     def __init__(self):
         """Google Sheets helper class to retrieve csv data
         """
-        self.auth = conf_auth.Authentication()
+        self.auth = _get_auth()
         self._link = self.auth.gsheets['db_link']
         self.data : List[dict[str, Any]] = []
         self.data_by_index : dict = {}
@@ -29,8 +39,8 @@ class GoogleSheets:
         """
         url = self._link + "/gviz/tq?tqx=out:csv&sheet=" + sheet_name
         resp = urllib.request.urlopen(url)
-        lines = [ l.decode('utf-8') for l in resp.readlines() ]
-        cr = csv.DictReader(lines)
+        # rows are parsed while the response is read instead of buffering all decoded lines first
+        cr = csv.DictReader(io.TextIOWrapper(resp, encoding='utf-8', newline=''))
         self.fieldnames = cr.fieldnames
         self.sheet_name = sheet_name        
         self.data = []
@@ -64,3 +74,13 @@ class GoogleSheets:
         except PermissionError:
             time.sleep(5)
             os.replace(temp_fn, target_fn)
+
+
+def load_sheets(sheet_names : List[str], max_concurrent_requests : int = 8) -> List[GoogleSheets]:
+    """Load several sheets at once, the csv exports are requested concurrently.
+        Returns one GoogleSheets instance per name, in the same order as sheet_names
+    """
+    sheets = [GoogleSheets() for _ in sheet_names]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrent_requests, len(sheet_names)))) as executor:
+        list(executor.map(GoogleSheets.load_sheet, sheets, sheet_names))
+    return sheets
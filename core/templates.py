@@ -1,10 +1,16 @@
-import json
-import os.path
+from functools import lru_cache
+from pathlib import Path
+try:
+    import orjson as json_parser
+except ImportError:
+    import json as json_parser
 
+@lru_cache(maxsize=1)
 def load_templates_dict() -> dict:
     """Loads template strings dict from 'template_strings.json'.
     Should be hierarchy of dict->dict>values based on context.
     Important: Curly braces '{}' in template strings will be replaced with corresponding values using str.format
+    The file is only parsed on the first call, later calls return the same (shared) dict.
 
     For instance
     {
@@ -21,6 +27,5 @@ def load_templates_dict() -> dict:
         }
     }
     """
-    with open(os.path.join("templates", "template_strings_2023.json"), "r", encoding='utf-8') as f:
-        dct = json.load(f, )
-        return dct
\ No newline at end of file
+    # parsed from raw bytes, orjson is used if available
+    return json_parser.loads(Path("templates", "template_strings_2023.json").read_bytes())
\ No newline at end of file
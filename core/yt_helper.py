@@ -19,11 +19,19 @@ RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, IOError, http.client.NotConnecte
         http.client.CannotSendRequest, http.client.CannotSendHeader,
         http.client.ResponseNotReady, http.client.BadStatusLine)
 
+# UTC timestamp format used for scheduled broadcast times
+YT_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.0Z"
+
+# characters not allowed in YouTube titles and descriptions, replaced by a space
+YT_SANITIZE_TABLE = str.maketrans("<>", "  ")
+
 class YouTubeHelper:
     def __init__(self):
         """YouTube helper class to perform various actions, will immediately authenticate upon class instantiation
         """
         self.auth = conf_auth.Authentication(youtube=True, use_pickled_credentials=True)
+        #last known lifeCycleStatus per broadcast id, as seen by this process
+        self._broadcast_statuses : dict = {}
 
     def make_youtube_title(self, title : str) -> str:
         """Make sure title is valid for Youtube: <= 100 characters and no '<' or '>' symbols
@@ -31,20 +39,14 @@ class YouTubeHelper:
         if title is None:
             return None
             
-        title = title.replace("<", " ").replace(">", " ")
-        if len(title) > 100:
-            title = title[0:99]
-        return title
+        return title.translate(YT_SANITIZE_TABLE)[:100]
 
     def make_youtube_description(self, description : str) -> str:
         """Similar rules for the description as the title, but max length of 5000 characters
         """
         if description is None:
             return None
-        description = description.replace("<", " ").replace(">", " ")
-        if len(description) > 5000:
-            description = description[0:4999]
-        return description
+        return description.translate(YT_SANITIZE_TABLE)[:5000]
 
     def create_playlist(self, title : str, desc : str = "", privacy : str = "unlisted"):
         """Create playlist.
@@ -281,6 +283,8 @@ class YouTubeHelper:
         description = self.make_youtube_description(description)
         broadcast_info = self.auth.youtube.liveBroadcasts().insert(
             part="id,snippet,contentDetails,status",
+            # part also selects the written properties, so only the response is trimmed
+            fields="id,snippet(title,scheduledStartTime,liveChatId)",
             body={
                 "contentDetails": {
                     "closedCaptionsType": "closedCaptionsHttpPost" if enable_captions else "closedCaptionsDisabled",
@@ -303,7 +307,7 @@ class YouTubeHelper:
                 },
                 "snippet": {
                     "title": title,
-                    "scheduledStartTime": start_time.astimezone(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.0Z"),
+                    "scheduledStartTime": start_time.astimezone(tz=timezone.utc).strftime(YT_TIME_FORMAT),
                     "description": description,
                 },
                 "status": {
@@ -315,7 +319,8 @@ class YouTubeHelper:
         # Due to a bug in the Youtube Broadcast API we have to set the made for
         # kids and embeddable flags through the videos API separately
         update_resp = self.auth.youtube.videos().update(
-            part="id,contentDetails,status",
+            part="status",
+            fields="id",
             body={
                 "id": broadcast_info["id"],
                 "status": {
@@ -340,27 +345,34 @@ class YouTubeHelper:
 
         return broadcast_info
 
-    def make_broadcast_live(self, broadcast_id : str, stream_key_id : str):
+    def make_broadcast_live(self, broadcast_id : str, stream_key_id : str, broadcast_status : str = None):
         """transition broadcast to live, given that stream was already bound to it and is healthy
+
+        broadcast_status: optional lifeCycleStatus of the broadcast if already known, otherwise it is requested
         """
-        broadcast_status = self.get_broadcast_status(broadcast_id)
+        if broadcast_status is None:
+            broadcast_status = self.get_broadcast_status(broadcast_id)
         # Broadcast could be in the ready state (configured and a stream key was bound),
         # or in the created state (configured but no stream key attached yet).
         if broadcast_status != "ready" and broadcast_status != "created":
             print(f"Broadcast {broadcast_id} is in state {broadcast_status}, and cannot be (re-)made live")
             return
 
-        # Check the status of the live stream to make sure it's running before we make it live
-        retries = 0
+        # Check the status of the live stream to make sure it's running before we make it live,
+        # polling with increasing delays until it becomes active
         stream_status, stream_health = self.get_stream_status(stream_key_id)
+        retries = 0
+        for delay in (2, 3, 5, 10):
+            if stream_status == "active":
+                break
+            print(f"Stream (key {stream_key_id}) for " +
+                f"broadcast {broadcast_id} is not active (currently {stream_status}), " +
+                f"will wait {delay}s longer for data and retry")
+            time.sleep(delay)
+            retries += 1
+            stream_status, stream_health = self.get_stream_status(stream_key_id)
         if stream_status != "active":
-            print(f"Stream (key {stream_key_id}) for" +
-                f"broadcast {broadcast_id} is not active (currently {stream_status})." +
-                "will wait 5s longer for data and retry")
-            time.sleep(5)
-            retries = retries + 1
-            if retries >= 2:
-                print(f"Retried {retries} times and zoom stream is still not live!?")
+            print(f"Retried {retries} times and stream is still not live!?")
 
         if stream_health != "good":
             print(f"WARNING: Stream on computer (key {stream_key_id}) is active, but not healthy. Health status is {stream_health}")
@@ -370,13 +382,22 @@ class YouTubeHelper:
         start_transition_call = int(time.time())
         res = self.set_broadcast_status(broadcast_id, "live")
         end_transition_call = int(time.time())
+        # the transition response usually still reports liveStarting, record the requested
+        # state so that stop_and_unbind_broadcast can skip its status request
+        self._broadcast_statuses[broadcast_id] = "live"
         #self.record_stream_update_timestamp([start_transition_call, end_transition_call])
         return res
 
-    def stop_and_unbind_broadcast(self, broadcast_id : str):
+    def stop_and_unbind_broadcast(self, broadcast_id : str, broadcast_status : str = None):
         """stop broadcast, make video embeddable, and unbind stream key from it
+
+        broadcast_status: optional lifeCycleStatus of the broadcast if already known, otherwise it is requested
         """
-        broadcast_status = self.get_broadcast_status(broadcast_id)
+        if broadcast_status is None and self._broadcast_statuses.get(broadcast_id) == "live":
+            #we made it live ourselves, no need to ask again
+            broadcast_status = "live"
+        if broadcast_status is None:
+            broadcast_status = self.get_broadcast_status(broadcast_id)
         if broadcast_status == "complete":
             print(f"Broadcast {broadcast_id} has already been made complete, skipping redundant transition")
             return
@@ -661,7 +682,8 @@ class YouTubeHelper:
         """
         response = self.auth.youtube.liveStreams().list(
             id=stream_key_id,
-            part="status"
+            part="status",
+            fields="items(status(streamStatus,healthStatus/status))"
         ).execute()
         return response["items"][0]["status"]["streamStatus"], response["items"][0]["status"]["healthStatus"]["status"]
 
@@ -670,9 +692,28 @@ class YouTubeHelper:
         """
         response = self.auth.youtube.liveBroadcasts().list(
             id=broadcast_id,
-            part="status"
+            part="status",
+            fields="items(status/lifeCycleStatus)"
         ).execute()
-        return response["items"][0]["status"]["lifeCycleStatus"]
+        status = response["items"][0]["status"]["lifeCycleStatus"]
+        self._broadcast_statuses[broadcast_id] = status
+        return status
+
+    def get_broadcast_statuses(self, broadcast_ids : List[str]) -> dict:
+        """return dict of broadcast id -> lifeCycleStatus for all specified broadcasts, requested in batches of 50 ids
+        """
+        res = {}
+        for i in range(0, len(broadcast_ids), 50):
+            response = self.auth.youtube.liveBroadcasts().list(
+                id=",".join(broadcast_ids[i:i + 50]),
+                part="id,status",
+                maxResults=50,
+                fields="items(id,status/lifeCycleStatus)"
+            ).execute()
+            for item in response["items"]:
+                res[item["id"]] = item["status"]["lifeCycleStatus"]
+        self._broadcast_statuses.update(res)
+        return res
         
     def set_broadcast_status(self, broadcast_id : str, status : str):
         """set status of specified broadcast, e.g. to "live" or "complete" or "testing"
@@ -682,6 +723,8 @@ class YouTubeHelper:
             id=broadcast_id,
             part="status"
         ).execute()
+        if "status" in resp and "lifeCycleStatus" in resp["status"]:
+            self._broadcast_statuses[broadcast_id] = resp["status"]["lifeCycleStatus"]
         return resp
 
     def get_broadcast_statistics(self, broadcast_id : str):
@@ -689,7 +732,8 @@ class YouTubeHelper:
         """
         response = self.auth.youtube.videos().list(
             id=broadcast_id,
-            part="liveStreamingDetails"
+            part="liveStreamingDetails",
+            fields="items(liveStreamingDetails)"
         ).execute()
         return response["items"][0]["liveStreamingDetails"]
 
@@ -14,6 +14,11 @@ def find_match(papers : PapersDatabase, attendee_name : str, attendee_email : st
     best_score = -1
     best_paper = None
     num_best_scores = 0
+    #normalize the attendee's data once instead of for every paper
+    if attendee_name:
+        attendee_name = attendee_name.lower()
+    if attendee_email:
+        attendee_email = attendee_email.lower().strip()
     for paper in papers.data:
         score = 0
         if p_id is not None and len(p_id) > 1 and (paper['UID'].lower() == p_id.lower() or paper['UID'].lower().endswith("-" + p_id.lower())):
@@ -22,23 +27,16 @@ def find_match(papers : PapersDatabase, attendee_name : str, attendee_email : st
             fuzz_s = fuzz.ratio(title, paper['Title'])
             if fuzz_s > 60:
                 score += int(fuzz_s)
-        authors = paper['Authors'].split("|")
-        emails = paper['Contributor Email(s)'].split("|")
-        
         if attendee_name:
-            attendee_name = attendee_name.lower()
             author_fuzz_s = 0
-            for author in authors:               
+            for author in paper['Authors'].split("|"):
                 s = fuzz.ratio(author.lower(), attendee_name)
                 if s > 80 and s > author_fuzz_s:
                     author_fuzz_s = s
             score += int(author_fuzz_s/2)
         if attendee_email:
-            attendee_email = attendee_email.lower().strip()
-            for email in emails:
-                if email.lower().strip() == attendee_email:
-                    score += 100
-                    break
+            if any(email.lower().strip() == attendee_email for email in paper['Contributor Email(s)'].split("|")):
+                score += 100
         if score <= 0:
             continue
         if score > best_score:
@@ -99,8 +99,8 @@ def create_paper_request(dbx : dropbox.Dropbox, paper : dict, template : dict, d
 
     Returns name, request_link, id as dict.
     """
-    title = template['title'].format(**paper)
-    description = template['description'].format(**paper)
+    title = template['title'].format_map(paper)
+    description = template['description'].format_map(paper)
     names = [ paper['UID'] ]
     res = create_folder_requests(dbx, title, names, description, deadline, False)[0]
     paper['File Request ID'] = res['id']
@@ -1,16 +1,17 @@
 from core.auth import Authentication
 from core.templates import load_templates_dict
 from core.aws_email import send_aws_email_paper
-from auth0_helper import generate_password, user_update_merge_metadata, retrieve_users_via_export
+from auth0_helper import generate_password, generate_passwords, user_update_merge_metadata, retrieve_users_via_export
 import argparse
 import time
 
 
-def send_info_to_user(auth: Authentication, auth0_token: str, user: dict, template: dict, flag_invite_email_sent: bool):
-    """
+def send_info_to_user(auth: Authentication, auth0_token: str, user: dict, template: dict, flag_invite_email_sent: bool,
+                      password: str = None):
+    """password: the user's generated password if already known, otherwise it is generated
     """
     email = user["email"]
-    user["password"] = generate_password(email, auth.auth0["password_secret"])
+    user["password"] = password if password is not None else generate_password(email, auth.auth0["password_secret"])
     user["discord_invite_url"] = auth.discord["discord_invite_url"]
     print(f"sending email to {email}")
     response = send_aws_email_paper(auth, user, template)
@@ -30,11 +31,12 @@ def check_and_send_infos_to_users(auth: Authentication, auth0_token: str, templa
                  "user_metadata"] or not u["user_metadata"]["invite_email_sent"], users))
     print(f"{len(users)} users that are missing login info")
 
+    passwords = generate_passwords([u["email"] for u in users], auth.auth0["password_secret"])
     i = 0
-    for user in users:
+    for user, password in zip(users, passwords):
         i += 1
         print(f"\r\nprocessing {i}/{len(users)}")
-        send_info_to_user(auth, auth0_token, user, template, True)
+        send_info_to_user(auth, auth0_token, user, template, True, password)
         time.sleep(2)
 
 
@@ -42,11 +44,12 @@ def check_and_send_to_all_users(auth: Authentication, auth0_token: str, template
     users = retrieve_users_via_export(auth, auth0_token)
     print(f"{len(users)} users retrieved")
 
+    passwords = generate_passwords([u["email"] for u in users], auth.auth0["password_secret"])
     i = 0
-    for user in users:
+    for user, password in zip(users, passwords):
         i += 1
         print(f"\r\nprocessing {i}/{len(users)}")
-        send_info_to_user(auth, auth0_token, user, template, False)
+        send_info_to_user(auth, auth0_token, user, template, False, password)
         if i % 10 == 9:
             time.sleep(2)
 
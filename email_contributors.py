@@ -1,10 +1,11 @@
 from typing import List
 from core.auth import Authentication
 from core.templates import load_templates_dict
-from core.aws_email import send_aws_email_paper
+from core.aws_email import send_aws_email_paper, get_send_rate_limiter, get_recipient_attributes
 from core.google_sheets import GoogleSheets
 import argparse
-import time
+from collections import defaultdict
+from itertools import chain
 
 
 def send_emails(auth: Authentication, template : dict, without_slot_contributors : bool = True, event_prefix : str = None, session_id : str = None, ignore_various : bool = True):
@@ -12,23 +13,26 @@ def send_emails(auth: Authentication, template : dict, without_slot_contributors
     """
     rows = join_session_contributor_rows() if without_slot_contributors else join_slot_contributors()
     
-    if ignore_various:
-        rows = list(filter(lambda r: r["Track"] != "various", rows))
-    if event_prefix and len(event_prefix) > 0:
-        rows = list(filter(lambda r: r["Event Prefix"] == event_prefix, rows))
-    if session_id and len(session_id) > 0:
-        rows = list(filter(lambda r: r["Session ID"] == session_id, rows))
+    if not event_prefix:
+        event_prefix = None
+    if not session_id:
+        session_id = None
+    #single pass over the rows for all filters
+    rows = [r for r in rows
+            if (not ignore_various or r["Track"] != "various")
+            and (event_prefix is None or r["Event Prefix"] == event_prefix)
+            and (session_id is None or r["Session ID"] == session_id)]
     print(f"sending emails for {len(rows)} rows")
-    i = 0
-    for row in rows:
-        i += 1
+    limiter = get_send_rate_limiter(auth)
+    recipient_attributes = get_recipient_attributes(template)
+    n = len(rows)
+    for i, row in enumerate(rows, 1):
         sid = row["Session ID"]
         track = row["Track"]
-        print(f"\r\nrow {i}/{len(rows)} Session {sid} - Track {track}")
-        response = send_aws_email_paper(auth, row, template)
+        print(f"\r\nrow {i}/{n} Session {sid} - Track {track}")
+        limiter.wait()
+        response = send_aws_email_paper(auth, row, template, recipient_attributes)
         print(f"    {response}")
-        if i % 4 == 3:
-            time.sleep(2)
 
 
 def join_session_contributor_rows() -> List[dict]:
@@ -76,23 +80,15 @@ def join_slot_contributors() -> List[dict]:
     #items3_sheet = GoogleSheets()
     #items3_sheet.load_sheet("ItemsVISSpecial")
 
-    items = []
-    items.extend(items1_sheet.data)
-    items.extend(items2_sheet.data)
-    #items.extend(items3_sheet.data)
+    items_by_session : dict[str, List[dict]] = defaultdict(list)
 
-    items_by_session : dict[str, List[dict]] = {}
-
-    for item in items:
+    #single pass over all slot items, grouped by session
+    for item in chain(items1_sheet.data, items2_sheet.data):
         s_id = item["Session ID"]
         if type(s_id) != str or len(s_id.strip()) == 0 or s_id not in sessions_dict:
             print(f"WARNING: could not match session id {s_id}")
             continue
-
-        if s_id in items_by_session:
-            items_by_session[s_id].append(item)
-        else:
-            items_by_session[s_id] = [ item ]
+        items_by_session[s_id].append(item)
 
     for s in sessions:
         s_id = s["Session ID"]
@@ -100,8 +96,8 @@ def join_slot_contributors() -> List[dict]:
         if type(s_id) != str or len(s_id.strip()) == 0 or s_id not in items_by_session:
             print(f"WARNING: could not match session id {s_id} to any slot item")
             continue
-        emails_set = set()
-        emails = []
+        #lower-cased email -> first seen spelling, keeps order of first occurrence
+        emails : dict[str, str] = {}
         items = items_by_session[s_id]
         for item in items:
             cont_emails :str = item["Slot Contributors Emails"]
@@ -109,12 +105,8 @@ def join_slot_contributors() -> List[dict]:
                 continue
             for em in cont_emails.split('|'):
                 email : str = em.strip()
-                h = email.lower()
-                if h in emails_set:
-                    continue
-                emails_set.add(h)
-                emails.append(email)
-        s["Slot Contributors Emails"] = "|".join(emails)
+                emails.setdefault(email.lower(), email)
+        s["Slot Contributors Emails"] = "|".join(emails.values())
     return sessions
 
 if __name__ == '__main__':
@@ -1,65 +1,98 @@
 from core.auth import Authentication
 from core.templates import load_templates_dict
 from core.papers_db import PapersDatabase
-from core.aws_email import send_aws_email_paper
+from core.aws_email import send_aws_email_paper, get_send_rate_limiter, get_recipient_attributes
 
 import argparse
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# template key of the "upload_request" email by event prefix
+_UPLOAD_REQUEST_TEMPLATES = {
+    **dict.fromkeys(("a-vast-challenge", "a-scivis-contest", "w-mercado", "w-visxai"),
+                    "upload_request_associated_event_workshop_late"),
+    **dict.fromkeys(("a-ldav", "a-vizsec", "a-vds", "a-visap", "w-vis4dh", "w-topoinvis", "w-energyvis", "w-vis4good",
+                     "w-eduvis", "w-visxvision", "w-vahc", "w-visxprov", "a-biomedchallenge", "w-altvis", "w-viscomm",
+                     "w-cityvis", "w-nlviz", "s-vds", "w-vis4pandemres"),
+                    "upload_request_associated_event_workshop"),
+    **dict.fromkeys(("v-siggraph", "v-ismar", "v-vr"), "upload_request_vr_ismar"),
+    **dict.fromkeys(("v-short", "v-full", "v-cga"), "upload_request_full_short"),
+}
 
-def send_emails_to_authors(auth: Authentication, papers_csv_file: str, event_prefix: str, email_template: str, uid: str = None):
+
+# journal (TVCG/CGA) and conference paper prefixes
+_JOURNAL_PREFIXES = frozenset(("v-cga", "v-tvcg"))
+_PAPER_PREFIXES = frozenset(("v-cga", "v-tvcg", "v-short", "v-full"))
+
+
+def _missing_preview_template(event_prefix: str) -> str:
+    if event_prefix in _JOURNAL_PREFIXES:
+        return "missing_preview_tvcg_cga"
+    return "missing_preview"
+
+
+def _missing_urgent_template(event_prefix: str) -> str:
+    if event_prefix in _PAPER_PREFIXES:
+        return "missing_urgent"
+    return "missing_urgent_workshop"
+
+
+# email template name -> function returning the template key for an event prefix
+_TEMPLATE_DISPATCH = {
+    "upload_request": _UPLOAD_REQUEST_TEMPLATES.get,
+    "missing_preview": _missing_preview_template,
+    "missing_urgent": _missing_urgent_template,
+    "presentation_tips": lambda event_prefix: "presentation_tips",
+    "copyright_delay": lambda event_prefix: "copyright_delay",
+    "missing_video": lambda event_prefix: "missing_video",
+    "reminder_survey": lambda event_prefix: "reminder_survey",
+}
+
+
+def send_emails_to_authors(auth: Authentication, papers_csv_file: str, event_prefix: str, email_template: str, uid: str = None,
+                           max_concurrent_sends: int = 4):
     """send email for papers .
     authentication: Authentication instance in which aws ses client was authenticated
     papers_csv_file: path to papers db file
     event_prefix: event prefix to send to, can only do one at a time
+    max_concurrent_sends: number of mails that are sent concurrently
 
     """
-    papersDb = PapersDatabase(papers_csv_file)
+    # resolve the template first so that a misconfigured call fails before any data is loaded
     templates = load_templates_dict()
-    if email_template == "upload_request":
-        if event_prefix == "a-vast-challenge" or event_prefix == "a-scivis-contest" or event_prefix == "w-mercado"  or event_prefix == "w-visxai":
-            template = templates["upload_request_associated_event_workshop_late"]
-        elif event_prefix == "a-ldav" or event_prefix == "a-vizsec" or event_prefix == "a-vds" or event_prefix == "a-visap" or event_prefix == "w-vis4dh" or event_prefix == "w-topoinvis" or event_prefix == "w-energyvis" or event_prefix == "w-vis4good" or event_prefix == "w-eduvis" or event_prefix == "w-visxvision" or event_prefix == "w-vahc" or event_prefix == "w-visxprov" or event_prefix == "a-biomedchallenge" or event_prefix == "w-altvis" or event_prefix == "w-viscomm" or event_prefix == "w-cityvis" or event_prefix == "w-nlviz" or event_prefix == "s-vds" or event_prefix == "w-vis4pandemres":
-            template = templates["upload_request_associated_event_workshop"]
-        elif event_prefix == "v-siggraph" or event_prefix == "v-ismar" or event_prefix == "v-vr":
-            template = templates["upload_request_vr_ismar"]
-        elif event_prefix == "v-short" or event_prefix == "v-full" or event_prefix == "v-cga":
-            template = templates["upload_request_full_short"]
-    elif email_template == "missing_preview":
-        if event_prefix == "v-cga" or event_prefix == "v-tvcg":
-            template = templates["missing_preview_tvcg_cga"]
-        else:
-            template = templates["missing_preview"]
-    elif email_template == "missing_urgent":
-        if event_prefix == "v-cga" or event_prefix == "v-tvcg" or event_prefix == "v-short" or event_prefix == "v-full":
-            template = templates["missing_urgent"]
-        else:
-            template = templates["missing_urgent_workshop"]
-    elif email_template == "presentation_tips":
-        template = templates["presentation_tips"]
-    elif email_template == "copyright_delay":
-        template = templates["copyright_delay"]
-    elif email_template == "missing_video":
-        template = templates["missing_video"]
-    elif email_template == "reminder_survey":
-        template = templates["reminder_survey"]
+    resolve = _TEMPLATE_DISPATCH.get(email_template)
+    template_key = resolve(event_prefix) if resolve else None
+    if template_key is None or template_key not in templates:
+        raise ValueError(f"No template for {email_template}/{event_prefix}")
+    template = templates[template_key]
+
+    papersDb = PapersDatabase(papers_csv_file)
 
     if uid is not None:
-        papers = list(filter(lambda p: p["UID"] == uid, papersDb.data))
+        papers = [papersDb.data_by_uid[uid]] if uid in papersDb.data_by_uid else []
     elif event_prefix is not None:
-        papers = list(
-            filter(lambda p: p["Event Prefix"] == event_prefix, papersDb.data))
+        papers = [p for p in papersDb.data if p["Event Prefix"] == event_prefix]
 
     print(f"{len(papersDb.data)} total papers loaded, filtered for {event_prefix}, for which {len(papers)} papers will be processed.")
 
-    for i in range(len(papers)):
-        paper = papers[i]
-        print(f"paper {i+1}/{len(papers)} {paper['UID']}")
-        response = send_aws_email_paper(auth, paper, template)
-        print(f"    {response}")
-        if i % 4 == 3:
-            print(f"    saved. Waiting 2s...")
-            time.sleep(2)
+    limiter = get_send_rate_limiter(auth)
+    recipient_attributes = get_recipient_attributes(template)
+
+    def send(paper: dict):
+        limiter.wait()
+        return send_aws_email_paper(auth, paper, template, recipient_attributes)
+
+    # SES calls overlap on a few threads, the shared limiter keeps the overall send rate within quota
+    n = len(papers)
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent_sends)) as executor:
+        futures = {executor.submit(send, paper): paper for paper in papers}
+        for i, future in enumerate(as_completed(futures), 1):
+            paper = futures[future]
+            print(f"paper {i}/{n} {paper['UID']}")
+            try:
+                response = future.result()
+            except Exception as ex:
+                response = f"ERROR: {ex}"
+            print(f"    {response}")
 
 
 if __name__ == '__main__':
@@ -79,6 +112,8 @@ if __name__ == '__main__':
         '--uid', help='filter papers that match this UID', default=None)
     parser.add_argument(
         '--email_template', help='template to use for the email (e.g., \"upload_request\", \"missing_preview\")', default="upload_request")
+    parser.add_argument(
+        '--max_concurrent', help='maximum number of emails sent concurrently', default=4, type=int)
 
     args = parser.parse_args()
     auth = Authentication(email=True)
@@ -92,4 +127,4 @@ if __name__ == '__main__':
         # send emails only if event_prefix provided, never send all db
         if args.event_prefix is not None:
             send_emails_to_authors(
-                auth, args.papers_csv_file, args.event_prefix, args.email_template, args.uid)
+                auth, args.papers_csv_file, args.event_prefix, args.email_template, args.uid, args.max_concurrent)
@@ -8,6 +8,7 @@ import string
 import time
 
 from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from email.mime.image import MIMEImage
 import urllib.request
@@ -25,7 +26,7 @@ def call_get_attendees(session : auth.Authentication, page : int = 1):
     with urllib.request.urlopen(req) as u:
         return json.loads(u.read().decode('utf-8'))
 
-def get_attendees(session : auth.Authentication):
+def get_attendees(session : auth.Authentication, max_concurrent_requests : int = 8):
     
     # Get the resource URI for the attendee page since we have to do the paginated
     # requests ourselves
@@ -39,11 +40,14 @@ def get_attendees(session : auth.Authentication):
     # being able to continue calling get_event_attendees
     # It looks like we can also directly request a page by passing page: <number>
 
+    # Page indices start at 1 inclusive, the first page is already loaded and
+    # the remaining ones are requested concurrently
+    pages = [attendees]
+    with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+        pages.extend(executor.map(lambda i: call_get_attendees(session, i), range(2, last_page + 1)))
+
     res = []
-    # Page indices start at 1 inclusive
-    for i in range(1, last_page + 1):
-        #print(f"Fetching eventbrite registrations page {i} of {last_page}")        
-        attendees = call_get_attendees(session, i)
+    for attendees in pages:
         if not "attendees" in attendees:
             print("Error fetching eventbrite response?")
             print(attendees)
@@ -6,21 +6,29 @@ from threading import local
 import ics
 # from PIL import Image
 from datetime import timezone, datetime, timedelta
+from functools import lru_cache
 import argparse
 
 from core.auth import Authentication
-from core.google_sheets import GoogleSheets
+from core.google_sheets import load_sheets
 
 # Melbourne is in GMT+11, AEDT
 conf_tz = timezone(timedelta(hours=11))
 
 
+@lru_cache(maxsize=None)
+def split_list(value: str, sep: str = "|") -> tuple:
+    """split a separated sheet cell into stripped entries, cached since e.g. chairs and authors repeat across rows
+    """
+    return tuple(v.strip() for v in value.split(sep)) if value else ()
+
+
 def parse_time(t: str):
     return datetime.fromisoformat(t.replace("Z", "+00:00"))
 
 
 def format_time_slot(start: datetime, end: datetime):
-    return start.strftime("%H%M") + "-" + end.strftime("%H%M")
+    return f"{start.hour:02d}{start.minute:02d}-{end.hour:02d}{end.minute:02d}"
 
 
 def format_time(t: datetime):
@@ -28,7 +36,7 @@ def format_time(t: datetime):
 
 
 def format_time_iso8601_utc(t: datetime):
-    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return f"{t.year:04d}-{t.month:02d}-{t.day:02d}T{t.hour:02d}:{t.minute:02d}:{t.second:02d}Z"
 
 
 def format_time_local(t: datetime):
@@ -37,26 +45,26 @@ def format_time_local(t: datetime):
 
 
 def make_description_for_session(session_title: str, session_id: str, session_room: str, start_time: datetime, end_time: datetime):
-    text = session_title + " [VIS 2023] \n\n"
+    parts = [session_title + " [VIS 2023] \n\n"]
     # if self.timeslot_entry(0, "Event URL").value:
-    #     text += "\nEvent Webpage: {}".format(self.timeslot_entry(0, "Event URL").value)
+    #     parts.append("\nEvent Webpage: {}".format(self.timeslot_entry(0, "Event URL").value))
 
     # NOTE: You'll want to replace this with the link to your conference session page
-    text += f"Session Webpage: https://virtual.ieeevis.org/year/2023/session_{session_id}.html \n"
+    parts.append(f"Session Webpage: https://virtual.ieeevis.org/year/2023/session_{session_id}.html \n")
 
-    text += f"Session Room: {session_room} \n\n"
+    parts.append(f"Session Room: {session_room} \n\n")
 
     # NOTE: include local time here as well
-    text += f"Session Start: {format_time_local(start_time)}\n" + \
-            f"Session End: {format_time_local(end_time)}"
+    parts.append(f"Session Start: {format_time_local(start_time)}\n")
+    parts.append(f"Session End: {format_time_local(end_time)}")
 
     # if self.timeslot_entry(0, "Discord Link").value:
-    #     text += "\nDiscord Link: " + self.timeslot_entry(0, "Discord Link").value
+    #     parts.append("\nDiscord Link: " + self.timeslot_entry(0, "Discord Link").value)
 
     # if self.timeslot_entry(0, "Chair(s)").value:
-    #     text += "\nSession Chair(s): " + self.timeslot_entry(0, "Chair(s)").value.replace("|", ", ")
+    #     parts.append("\nSession Chair(s): " + self.timeslot_entry(0, "Chair(s)").value.replace("|", ", "))
 
-    return text
+    return "".join(parts)
 
 
 def make_calendar_for_session(session_title: str, session_id: str, session_room: str, start_time: datetime, end_time: datetime) -> ics.Calendar:
@@ -104,40 +112,12 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
     all_papers = {}
     all_events = {}
 
-    sheet_events = GoogleSheets()
-    sheet_events.load_sheet("Events")
-
-    sheet_sessions = GoogleSheets()
-    sheet_sessions.load_sheet("Sessions")
-
-    sheet_papers = GoogleSheets()
-    sheet_papers.load_sheet("ItemsVIS-A")
-
-    sheet_ext = GoogleSheets()
-    sheet_ext.load_sheet("ItemsEXT")
-
-    sheet_ff_playlists = GoogleSheets()
-    sheet_ff_playlists.load_sheet("FFPlaylists")
-
-    sheet_ff_videos = GoogleSheets()
-    sheet_ff_videos.load_sheet("FFVideos")
-
-    sheet_pre_videos = GoogleSheets()
-    sheet_pre_videos.load_sheet("Videos")
-
-    sheet_bunny = GoogleSheets()
-    sheet_bunny.load_sheet("BunnyContent")
-
-    sheet_posters = GoogleSheets()
-    sheet_posters.load_sheet("Posters")
-
-    # All paper types, full, short, workshop
-    sheet_db_papers = GoogleSheets()
-    sheet_db_papers.load_sheet("PapersDB")
-
-    # All tracks/rooms of the conference, create dict based on "Track"
-    sheet_tracks = GoogleSheets()
-    sheet_tracks.load_sheet("Tracks")
+    # All paper types, full, short, workshop in "PapersDB"
+    # All tracks/rooms of the conference in "Tracks", create dict based on "Track"
+    sheet_events, sheet_sessions, sheet_papers, sheet_ext, sheet_ff_playlists, sheet_ff_videos, \
+        sheet_pre_videos, sheet_bunny, sheet_posters, sheet_db_papers, sheet_tracks = load_sheets(
+            ["Events", "Sessions", "ItemsVIS-A", "ItemsEXT", "FFPlaylists", "FFVideos",
+             "Videos", "BunnyContent", "Posters", "PapersDB", "Tracks"])
 
     db_papers_dict = dict()
     for db_p in sheet_db_papers.data:
@@ -163,6 +143,12 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
     for t in sheet_tracks.data:
         tracks_dict[t["Track"]] = t
 
+    # Paper and external items grouped by session, so that each session
+    # does not have to scan both sheets again
+    items_by_session = dict()
+    for p in sheet_papers.data + sheet_ext.data:
+        items_by_session.setdefault(p["Session ID"], []).append(p)
+
     for e in sheet_events.data:
         e_data = {
             "event": e["Event"],
@@ -171,7 +157,7 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
             "event_prefix": e["Event Prefix"],
             "event_description": e["Event Description"],
             "event_url": e["Event URL"],
-            "organizers": [o.strip() for o in e["Organizers"].split("|")] if e["Organizers"] else [],
+            "organizers": split_list(e["Organizers"]),
             "sessions": []
         }
 
@@ -184,8 +170,11 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
     # Create session data
     for s in sheet_sessions.data:
         sid = s["Session ID"]
-        t = tracks_dict[s["Track"]] if s["Track"] in tracks_dict else None
-        s_ff = ff_videos_dict[sid] if sid in ff_videos_dict else None
+        t = tracks_dict.get(s["Track"])
+        s_ff = ff_videos_dict.get(sid)
+        #parsed once, used for the json data and the calendar
+        start_time = parse_time(s["DateTime Start"]) if "DateTime Start" in s and s["DateTime Start"] != "" else None
+        end_time = parse_time(s["DateTime End"]) if "DateTime End" in s and s["DateTime End"] != "" else None
 
         s_data = {
             "title": s["Session Title"],
@@ -193,10 +182,10 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
             "event_prefix": s["Event Prefix"],
             "track": s["Track"],
             "session_image": f'{s["Session ID"]}.png',
-            "chair": [c.strip() for c in s["Session Chairs"].split("|")] if s["Session Chairs"] else [],
+            "chair": split_list(s["Session Chairs"]),
             # "organizers": [], does this need to be filled in?
-            "time_start": format_time_iso8601_utc(parse_time(s["DateTime Start"])) if "DateTime Start" in s and s["DateTime Start"] != "" else "",
-            "time_end": format_time_iso8601_utc(parse_time(s["DateTime End"])) if "DateTime End" in s and s["DateTime End"] != "" else "",
+            "time_start": format_time_iso8601_utc(start_time) if start_time else "",
+            "time_end": format_time_iso8601_utc(end_time) if end_time else "",
             "discord_category": "",
             "discord_channel": t["Discord Channel"] if t else "",
             "discord_channel_id": t["Discord Channel ID"] if t else "",
@@ -211,8 +200,8 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
         }
 
         if export_ics:
-            calendar = make_calendar_for_session(s["Session Title"], s["Session ID"], t["Room Name"] if t else "", parse_time(
-                s["DateTime Start"]), parse_time(s["DateTime End"]))
+            calendar = make_calendar_for_session(s["Session Title"], s["Session ID"], t["Room Name"] if t else "",
+                                                 start_time, end_time)
 
             full_calendar.events |= calendar.events
 
@@ -224,19 +213,13 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
             with open(os.path.join(output_dir, "ics", s["Session ID"] + ".ics"), "w", encoding="utf8") as f:
                 f.write(calendar.serialize())
 
-        filtered_papers = list(
-            filter(lambda p: p["Session ID"] == s_data["session_id"], sheet_papers.data))
-
-        filtered_ext = list(
-            filter(lambda e: e["Session ID"] == s_data["session_id"], sheet_ext.data))
-
-        for p in filtered_papers + filtered_ext:
+        for p in items_by_session.get(s_data["session_id"], []):
             # Find the corresponding entry by Paper UID in PapersDB
             uid = p["Paper UID"]
-            p_db = db_papers_dict[uid] if uid in db_papers_dict else None
-            ff = ff_videos_dict[uid] if uid in ff_videos_dict else None
-            pv = pre_videos_dict[uid] if uid in pre_videos_dict else None
-            bc = bunny_dict[uid] if uid in bunny_dict else None
+            p_db = db_papers_dict.get(uid)
+            ff = ff_videos_dict.get(uid)
+            pv = pre_videos_dict.get(uid)
+            bc = bunny_dict.get(uid)
 
             p_event_prefix = p_db["Event Prefix"] if p_db else ""
 
@@ -259,21 +242,23 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
                 paper_type = "tutorial"
 
             # If presenter changed exists, then change contributors list
-            contributors = p["Slot Presenters Changed"] if p["Slot Presenters Changed"] else p["Slot Contributors"]
+            contributors = p["Slot Presenters Changed"] or p["Slot Contributors"]
+
+            slot_start = format_time_iso8601_utc(parse_time(p["Slot DateTime Start"])) if (p and "Slot DateTime Start" in p and p["Slot DateTime Start"] != "") else ""
 
             p_data = {
                 "slot_id": p["Item ID"],
                 "session_id": p["Session ID"],
                 "title": p["Slot Title"],
-                "contributors": [c.strip() for c in contributors.split("|")] if contributors else [],
-                "authors": [a.strip() for a in p_db["Authors"].split("|")] if (p_db and "Authors" in p_db and p_db["Authors"]) else [],
+                "contributors": split_list(contributors),
+                "authors": split_list(p_db["Authors"]) if (p_db and "Authors" in p_db) else (),
                 "abstract": p_db["Abstract"] if p_db else "",
                 "uid": p["Paper UID"],
-                "time_stamp": format_time_iso8601_utc(parse_time(p["Slot DateTime Start"])) if (p and "Slot DateTime Start" in p and p["Slot DateTime Start"] != "") else "",
-                "time_start": format_time_iso8601_utc(parse_time(p["Slot DateTime Start"])) if (p and "Slot DateTime Start" in p and p["Slot DateTime Start"] != "") else "",
+                "time_stamp": slot_start,
+                "time_start": slot_start,
                 "time_end": format_time_iso8601_utc(parse_time(p["Slot DateTime End"])) if (p and "Slot DateTime End" in p and p["Slot DateTime End"] != "") else "",
                 "paper_type": paper_type,
-                "keywords": [k.strip() for k in p_db["Keywords"].split("|")] if p_db and p_db["Keywords"] else [],
+                "keywords": split_list(p_db["Keywords"]) if p_db else (),
                 "doi": p_db["DOI"] if p_db else "",
                 "fno": p_db["FNO"] if p_db else "",
                 "has_image": p_db["Has Image"] == "1" if p_db else False,
@@ -314,8 +299,8 @@ def create_data_for_web(auth: Authentication, output_dir: str, export_ics: bool,
             "title": p["Title"],
             "uid": p["UID"],
             "discord_channel": "",
-            "authors": [a.strip() for a in p["Authors"].split("|")] if p["Authors"] else [],
-            "author_affiliations": [a.strip() for a in p["ACM Author Affiliations"].split(";")] if p["ACM Author Affiliations"] else [],
+            "authors": split_list(p["Authors"]),
+            "author_affiliations": split_list(p["ACM Author Affiliations"], ";"),
             "presenting_author_name": p["Presenting Author (name)"],
             "presenting_author_email": p["Presenting Author (email)"],
             "abstract": p["Abstract"],
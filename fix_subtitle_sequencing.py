@@ -12,7 +12,7 @@ from datetime import timedelta
 # on screen in a hard to follow ordering. This script adjusts the timing
 # so that only one subtitle is active at any time.
 
-match_time = re.compile("(\d\d):(\d\d):(\d\d)\.(\d+)")
+match_time = re.compile(r"(\d\d):(\d\d):(\d\d)\.(\d+)")
 
 # Parse the timestamp and return hrs, mins, sec, milli
 def parse_time_stamp(time):
@@ -38,12 +38,6 @@ async def on_ready():
 
 @client.event
 async def on_message(msg):
-    f = open(brute_force_protection_file_name, "rb")
-    sender_dict = pickle.load(f)
-    f.close()
-    
-    user_dict_id = msg.author.name + msg.author.discriminator
-        
     if(msg.author == client.user):
         return
 
@@ -51,6 +45,13 @@ async def on_message(msg):
        msg.channel.id != role_channel_id):
         return
 
+    # only messages in the role channel need the brute force protection state
+    f = open(brute_force_protection_file_name, "rb")
+    sender_dict = pickle.load(f)
+    f.close()
+    
+    user_dict_id = msg.author.name + msg.author.discriminator
+
     if(user_dict_id in sender_dict.keys()):
         if(sender_dict[user_dict_id] >= 3):
             await msg.author.send(content = "You tried to unlock too often. Please contact an administrator for help.")
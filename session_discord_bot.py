@@ -48,23 +48,24 @@ async def on_ready():
             general_channel = ch
             break
     #client.loop.create_task(post_session_info())
-    for s in sessions_sheet.data:
+    channels_by_id = {ch.id: ch for ch in guild.text_channels}
+    #resolve the discord channel of each track used by a session only once
+    track_channels = {}
+    for start, end, s in sessions:
         sid = s["Session ID"]
         if(len(sid.strip()) == 0):
             continue
         tr = s["Track"]
         if tr is None or tr not in tracks_dict:
             continue
-        track = tracks_dict[tr]
-        ch_id_s = track["Discord Channel ID"].strip()
-        if(len(ch_id_s) == 0):
+        if tr not in track_channels:
+            ch_id_s = tracks_dict[tr]["Discord Channel ID"].strip()
+            track_channels[tr] = channels_by_id.get(int(ch_id_s)) if len(ch_id_s) > 0 else None
+        ch = track_channels[tr]
+        if ch is None:
             continue
-        ch_id = int(ch_id_s)
-        for ch in guild.text_channels:
-            if ch.id == ch_id:
-                session_id_to_channel[sid] = ch
-                print(f"Found channel {ch.name} for session {sid}, start at {datetime.fromisoformat(s['DateTime Start'].replace('Z', '+00:00'))}")
-                break
+        session_id_to_channel[sid] = ch
+        print(f"Found channel {ch.name} for session {sid}, start at {start + timedelta(minutes=5)}")
 
 
     print("Bot ready.")
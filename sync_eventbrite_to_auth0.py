@@ -2,23 +2,51 @@ import argparse
 import sys
 import time
 import os
+import mmap
+import base64
+import re
 import json
+import logging
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import os.path as path
 import bcrypt  # bcrypt
-import string
 import secrets
 import time
 import http.client
-import requests
 
-from urllib.parse import urlsplit
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import datetime, timezone
 from email.mime.image import MIMEImage
 
 import core.auth as auth
+import eventbrite_helper
+from auth0_helper import random_password, send_to_auth0, auth0_session
 import core.schedule as schedule
 
-alphabet = string.ascii_letters + string.digits
+log = logging.getLogger(__name__)
+
+_line_pattern = re.compile(rb"[^\r\n]+")
+# bcrypt uses its own base64 alphabet
+_bcrypt_base64 = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+                                 b"./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789")
+# maximum number of users per auth0 import job and number of jobs uploaded at once
+import_chunk_size = 1000
+max_concurrent_imports = 2
+# seconds to wait for a single import job before it is retried on the next run
+import_job_timeout = 15 * 60
+
+def _json_dumps(obj, indent=False) -> bytes:
+    # orjson is optional, the standard json module is used as fallback
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+def _json_loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
 
 def load_logo_attachment(filename):
     with open(filename, "rb") as f:
@@ -27,48 +55,124 @@ def load_logo_attachment(filename):
         attachment.add_header("Content-ID", "<logo_image>")
         return attachment
 
-def load_already_registered():
+def _date_to_timestamp(date) -> int:
+    # older registered.json files store the utc date as string
+    if isinstance(date, str):
+        return int(datetime.fromisoformat(date).replace(tzinfo=timezone.utc).timestamp())
+    return date
+
+class RegisteredTable:
+    """Registered users stored column-wise, rows are looked up by email
+    """
+    def __init__(self):
+        self.index = {}
+        self.emails = []
+        self.names = []
+        self.passwords = []
+        self.dates = []
+        self.emailed = bytearray()
+        self.imported = bytearray()
+
+    def __len__(self):
+        return len(self.emails)
+
+    def add(self, email : str, name : str, password : str, date : int) -> int:
+        """adds a new user that is neither emailed nor imported to auth0 yet, returns its row
+        """
+        row = len(self.emails)
+        self.index[email] = row
+        self.emails.append(email)
+        self.names.append(name)
+        self.passwords.append(password)
+        self.dates.append(date)
+        self.emailed.append(0)
+        self.imported.append(0)
+        return row
+
+    def set_emailed(self, email : str):
+        self.emailed[self.index[email]] = 1
+
+    def set_imported(self, email : str):
+        self.imported[self.index[email]] = 1
+
+    @staticmethod
+    def from_dict(registered : dict) -> "RegisteredTable":
+        table = RegisteredTable()
+        rows = list(registered.values())
+        table.emails = [x["email"] for x in rows]
+        table.names = [x["name"] for x in rows]
+        table.passwords = [x["password"] for x in rows]
+        table.dates = [_date_to_timestamp(x["date"]) for x in rows]
+        table.emailed = bytearray(1 if x.get("emailed", False) else 0 for x in rows)
+        # users stored before the flag existed were always imported
+        table.imported = bytearray(1 if x.get("imported", True) else 0 for x in rows)
+        table.index = {email: row for row, email in enumerate(table.emails)}
+        return table
+
+    def to_dict(self) -> dict:
+        return {email: {"name": name,
+                        "email": email,
+                        "password": password,
+                        "date": date,
+                        "emailed": emailed == 1,
+                        "imported": imported == 1}
+                for email, name, password, date, emailed, imported in
+                zip(self.emails, self.names, self.passwords, self.dates, self.emailed, self.imported)}
+
+def load_already_registered() -> RegisteredTable:
     res = {}
     if path.exists("registered.json"):
-        with open("registered.json", "r") as f:
-            res = json.load(f)
-    return res
-
-
-def format_to_auth0(email, name, password, password_hash):
-    return {
-        "email": email,
-        "email_verified": True,
-        "name": name,
-        "password_hash": password_hash.decode('utf-8'),
-    }
-
-def send_to_auth0(session, filename, access_token, connection_id):
-    payload = {
-        "connection_id": connection_id,
-        "external_id": "import_user",
-        "send_completion_email": False
-    }
-
-    files = {
-        "users": open(filename, "rb")
-    }
-
-    headers = {
-        'authorization': f"Bearer {access_token}"
-    }
-
-    domain = "https://" + urlsplit(session.auth0["audience"]).netloc + "/api/v2/jobs/users-imports"
-    response = requests.post(domain, data=payload, files=files,
-                             headers=headers)
-    print(response.content)
-
-def send_register_email(email, session, logo_attachment, name, password):
-    discord_invite = ""
+        with open("registered.json", "rb") as f:
+            res = _json_loads(f.read())
+    return RegisteredTable.from_dict(res)
+
+
+def encode_to_auth0(email, name, password_hash) -> bytes:
+    # JSON encoded user for the auth0 bulk import, only the values need
+    # escaping so the constant keys are written as they are
+    return b"".join((
+        b'{"email":', _json_dumps(email),
+        b',"email_verified":true,"name":', _json_dumps(name),
+        b',"password_hash":', _json_dumps(password_hash.decode('utf-8')),
+        b'}'))
+
+def import_to_auth0(session, filename, access_token, connection_id) -> bool:
+    """uploads the users file as auth0 import job and waits for it, returns whether the job completed
+    """
+    response = send_to_auth0(session, filename, access_token, connection_id)
+    if not response.ok:
+        return False
+    # wait for the import job to finish, so that no more than max_concurrent_imports jobs run at once
+    job_id = response.json()["id"]
+    url = "https://" + session.auth0["domain"] + f"/api/v2/jobs/{job_id}"
+    headers = {'authorization': f"Bearer {access_token}"}
+    deadline = time.monotonic() + import_job_timeout
+    while time.monotonic() < deadline:
+        time.sleep(2)
+        job_response = auth0_session.get(url, headers=headers)
+        job_res = job_response.json() if job_response.ok else {}
+        status = job_res.get("status")
+        # error answers such as rate limits carry no status, so the job is asked again
+        if status is None or status in ("pending", "processing"):
+            continue
+        if status != "completed":
+            log.warning("auth0 import job %s for %s ended with status %s: %s", job_id, filename, status, job_res)
+            return False
+        log.debug("auth0 import job %s completed: %s", job_id, job_res)
+        return True
+    log.warning("auth0 import job %s for %s did not finish within %s s", job_id, filename, import_job_timeout)
+    return False
+
+@lru_cache(maxsize=1)
+def get_discord_invite():
+    # the invite is the same for every registration email, only look it up (and warn) once
     if not "SUPERMINISTREAM_DISCORD_INVITE" in os.environ:
         print("WARNING: You must provide the discord_invite url in $SUPERMINISTREAM_DISCORD_INVITE")
-    else:
-        discord_invite = os.environ["SUPERMINISTREAM_DISCORD_INVITE"]
+        return ""
+    return os.environ["SUPERMINISTREAM_DISCORD_INVITE"]
+
+def send_register_email(email, session, logo_attachment, name, password):
+    discord_invite = get_discord_invite()
 
     # Send them an email with the account name and password
     email_html = f"""
@@ -116,6 +220,9 @@ def send_register_email(email, session, logo_attachment, name, password):
     if logo_attachment:
         attachments = [logo_attachment]
 
+    # throttle sending to stay below the email rate limit
+    time.sleep(0.1)
+
     schedule.send_html_email("VIS 2021 Registration",
             email_html,
             email,
@@ -124,49 +231,48 @@ def send_register_email(email, session, logo_attachment, name, password):
             attachments=attachments)
 
 
-def get_any_password_requests():
-    password_requests = []
-    for f in os.listdir("./"):
-        if f.startswith("password_request"):
-            with open(f, "r") as fhandle:
-                for l in fhandle.readlines():
-                    line = l.strip()
-                    if len(line) > 0:
-                        password_requests.append(line)
+def bulk_salts(n, rounds=10):
+    # same format as bcrypt.gensalt, but the random bytes of all salts are read at once
+    raw = secrets.token_bytes(16 * n)
+    prefix = b"$2b$%02d$" % rounds
+    return [prefix + base64.b64encode(raw[i * 16:(i + 1) * 16]).translate(_bcrypt_base64)[:22] for i in range(n)]
+
+def hash_passwords_parallel(passwords, rounds=10):
+    # bcrypt releases the GIL while hashing, so the hashes are computed in parallel threads
+    salts = bulk_salts(len(passwords), rounds)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(bcrypt.hashpw, passwords, salts))
+
+def get_any_password_requests() -> frozenset:
+    password_requests = set()
+    names = []
+    with os.scandir(".") as it:
+        for entry in it:
+            if not entry.name.startswith("password_request") or not entry.is_file(follow_symlinks=False):
+                continue
+            names.append(entry.name)
+    for f in names:
+        with open(f, "rb") as fhandle:
+            # mmap cannot map empty files
+            if os.fstat(fhandle.fileno()).st_size == 0:
+                continue
+            with mmap.mmap(fhandle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                password_requests.update(m.group().strip().decode("utf-8")
+                                         for m in _line_pattern.finditer(mm) if m.group().strip())
+    password_requests = frozenset(password_requests)
     print(f"Got password requests {password_requests}")
     return password_requests
 
 def get_new_eventbrite(session):
-    eventbrite_event_id = session.eventbrite_event_id
-
-    # Get the resource URI for the attendee page since we have to do the paginated
-    # requests ourselves
-    attendees = session.eventbrite.get_event_attendees(eventbrite_event_id)
-    last_page = attendees["pagination"]["page_count"]
-
     # Note: Eventbrite's python SDK is half written essentially, and
-    # doesn't directly support paging properly. So to load the other
-    # pages we need to use the raw get call ourselves instead of 
-    # being able to continue calling get_event_attendees
-    # It looks like we can also directly request a page by passing page: <number>
-
+    # doesn't directly support paging properly, so we go through the raw
+    # API which also lets us fetch all pages concurrently
     eventbrite_registrations = []
-    # Page indices start at 1 inclusive
-    for i in range(1, last_page + 1):
-        print(f"Fetching eventbrite registrations page {i} of {last_page}")
-        args = {
-            'page': i
-        }
-        attendees = session.eventbrite.get(attendees.resource_uri, args)
-        if not "attendees" in attendees:
-            print("Error fetching eventbrite response?")
-            print(attendees)
-            break
-        for a in attendees["attendees"]:
-            eventbrite_registrations.append((
-                a["profile"]["name"],
-                a["profile"]["email"]
-            ))
+    for a in eventbrite_helper.get_attendees(session):
+        eventbrite_registrations.append((
+            a["profile"]["name"],
+            a["profile"]["email"]
+        ))
 
     return eventbrite_registrations
 
@@ -176,81 +282,106 @@ def get_all(transmit_to_auth0, session, logo_attachment, max_new=-1):
     all_registered = load_already_registered()
 
     all_new = []
-    for email, x in all_registered.items():
-        if "emailed" not in x:
-            x["emailed"] = False
-        if not x["emailed"]:
-            results.append([x["name"], x["email"]])
-
-    now = str(datetime.utcnow())
-    for x in results:
-        name, email = x
-        if max_new > 0 and len(all_new) >= max_new:
-            break
-        if len(email) == 0:
-            continue
-        # We use this same process to re-send someone their login info, so they could be
-        # already registered
-        if email not in all_registered or not all_registered[email]["emailed"]:
-            print(f"adding {email}")
-            # random password
-            password = ""
-            if email not in all_registered:
-                password = ''.join(secrets.choice(alphabet) for i in range(10)).encode("utf-8")
-            else:
-                password = all_registered[email]["password"].encode("utf-8")
-
-            salt = bcrypt.gensalt(rounds=10)
-            password_hash = bcrypt.hashpw(password, salt)
-
-            all_new.append(format_to_auth0(email, name, password, password_hash))
-            all_registered[email] = {"name": name,
-                                     "email": email,
-                                     "password": password.decode('utf-8'),
-                                     "date": now,
-                                     "emailed": False}
-        elif email in password_requests:
-            print(f"Password request for {email}")
-        else:
-            continue
-        password = all_registered[email]["password"]
-
-        if session.email:
-            time.sleep(0.1)
-
-        try: 
-            if session.email:
-                send_register_email(email, session, logo_attachment, name, password)
-                all_registered[email]["emailed"] = True
-        except Exception as e:
-            print("Error sending email {}".format(e))
-
-    print(f"Got {len(all_new)} new registrations")
+    # Eventbrite registrations by email, the first occurrence of an email wins
+    eventbrite_names = {}
+    for name, email in results:
+        if len(email) > 0 and email not in eventbrite_names:
+            eventbrite_names[email] = name
+
+    # We use this same process to re-send someone their login info, so the
+    # candidates are split into four disjoint groups up front
+    registered_emails = all_registered.index.keys()
+    to_create = [email for email in eventbrite_names if email not in registered_emails]
+    # users of failed import jobs keep their stored password and are imported again
+    to_reimport = [email for email, imported in zip(all_registered.emails, all_registered.imported) if not imported]
+    to_resend = [email for email, emailed, imported in
+                 zip(all_registered.emails, all_registered.emailed, all_registered.imported) if imported and not emailed]
+    password_reset = [email for email in password_requests & registered_emails
+                      if all_registered.emailed[all_registered.index[email]]]
+    if max_new > 0:
+        to_create = to_create[:max_new]
+        to_reimport = to_reimport[:max(0, max_new - len(to_create))]
+        to_resend = to_resend[:max(0, max_new - len(to_create) - len(to_reimport))]
+
+    # registration dates are stored as utc epoch seconds
+    now = int(time.time())
+    for email in to_create:
+        print(f"adding {email}")
+        # random password
+        all_registered.add(email, eventbrite_names[email], random_password(10), now)
+    for email in to_reimport:
+        print(f"Importing {email} again")
+    # the other users in registered.json were already imported to auth0, so they only
+    # need their email and no new password hash
+    for email in to_resend:
+        print(f"Resending login info to {email}")
+    for email in password_reset:
+        print(f"Password request for {email}")
+
+    # the expensive bcrypt hashing is done for all users to import in one batch
+    to_import = to_create + to_reimport
+    rows = [all_registered.index[email] for email in to_import]
+    password_hashes = hash_passwords_parallel([all_registered.passwords[row].encode("utf-8") for row in rows])
+    for email, row, password_hash in zip(to_import, rows, password_hashes):
+        all_new.append(encode_to_auth0(email, all_registered.names[row], password_hash))
+
+    print(f"Got {len(to_create)} new registrations")
 
     registration_stats = {}
     registration_stats_file = "registration_stats.json"
     if os.path.isfile(registration_stats_file):
-        with open("registration_stats.json", "r") as f:
-            registration_stats = json.load(f)
-        registration_stats["new_since_last"] += len(all_new)
+        with open("registration_stats.json", "rb") as f:
+            registration_stats = _json_loads(f.read())
+        registration_stats["new_since_last"] += len(to_create)
     else:
-        registration_stats["new_since_last"] = len(all_new)
+        registration_stats["new_since_last"] = len(to_create)
 
     print(registration_stats)
 
-    with open(registration_stats_file, "w") as f:
-        json.dump(registration_stats, f)
+    with open(registration_stats_file, "wb") as f:
+        f.write(_json_dumps(registration_stats))
 
+    # without the auth0 upload the new users are only emailed
+    imported_emails = to_import
     if len(all_new) > 0:
-        file_name = f"new_imports_{time.time_ns() / 1000}.json"
-        with open(file_name, "w") as f:
-            json.dump(all_new, f)
+        # large imports are split into several auth0 import jobs that are uploaded concurrently
+        file_names = []
+        for i in range(0, len(all_new), import_chunk_size):
+            file_name = f"new_imports_{time.time_ns() / 1000}_{i // import_chunk_size}.json"
+            with open(file_name, "wb") as f:
+                f.write(b"[" + b",".join(all_new[i:i + import_chunk_size]) + b"]")
+            file_names.append(file_name)
         if transmit_to_auth0:
-            print("Sending to Auth0")
+            print(f"Sending to Auth0 in {len(file_names)} import jobs")
             token = session.get_auth0_token()
-            send_to_auth0(session, file_name, token, session.auth0["connection_id"])
-            with open("registered.json", "w") as f:
-                json.dump(all_registered, f, indent=4)
+            with ThreadPoolExecutor(max_workers=max_concurrent_imports) as executor:
+                imported = list(executor.map(lambda file_name: import_to_auth0(session, file_name, token, session.auth0["connection_id"]),
+                                             file_names))
+            imported_emails = []
+            for chunk, ok in enumerate(imported):
+                chunk_emails = to_import[chunk * import_chunk_size:(chunk + 1) * import_chunk_size]
+                if not ok:
+                    # the users stay in registered.json and are imported again with the same password
+                    print(f"Auth0 import of {file_names[chunk]} failed")
+                    continue
+                for email in chunk_emails:
+                    all_registered.set_imported(email)
+                imported_emails.extend(chunk_emails)
+
+    # login info is only sent once the user's import job has completed
+    if session.email:
+        for email in imported_emails + to_resend + password_reset:
+            row = all_registered.index[email]
+            try:
+                send_register_email(email, session, logo_attachment, all_registered.names[row], all_registered.passwords[row])
+                all_registered.set_emailed(email)
+            except Exception as e:
+                print("Error sending email {}".format(e))
+
+    # also store the emailed flags of resent logins, which are not part of all_new
+    if transmit_to_auth0 and (len(all_new) > 0 or len(to_resend) > 0 or len(password_reset) > 0):
+        with open("registered.json", "wb") as f:
+            f.write(_json_dumps(all_registered.to_dict(), indent=True))
     print(f"New registrations processed at {datetime.now()}")
 
 if __name__ == '__main__':
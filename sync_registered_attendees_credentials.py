@@ -56,6 +56,8 @@ def sync_attendees(auth: Authentication, vendor: Vendor):
         return
 
     auth0_users = get_auth0_users(auth)
+    # normalized emails of existing auth0 users for O(1) lookups
+    auth0_emails = {au['email'].strip().lower() for au in auth0_users}
 
     print(f"Found {len(attendees)} attendees from {vendor}")
 
@@ -91,10 +93,9 @@ def sync_attendees(auth: Authentication, vendor: Vendor):
 
         if name and email and isValid:
             # Check if user is already in auth0
-            au = next((a for a in auth0_users if a['email'].strip(
-            ).lower() == email.strip().lower()), None)
-            if au == None:
+            if email.strip().lower() not in auth0_emails:
                 create_user(auth, auth.get_auth0_token(), email, name, {'invite_email_sent': False})
+                auth0_emails.add(email.strip().lower())
 
 
 def monitor_sync_attendees(auth: Authentication, vendor: Vendor):
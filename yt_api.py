@@ -73,11 +73,12 @@ def stop_and_unbind_broadcasts(yt : YouTubeHelper, args : argparse.Namespace):
     
     num_to_schedule = len(data)
     print(f"{num_to_schedule} broadcasts will be stopped and unbound")
+    statuses = yt.get_broadcast_statuses([broadcast["Video ID"] for broadcast in data])
     for broadcast in data:
         v_id :str = broadcast["Video ID"]
         title : str = broadcast["Title"]
         print(f"stopping {v_id} - {title}")
-        res = yt.stop_and_unbind_broadcast(v_id)
+        res = yt.stop_and_unbind_broadcast(v_id, statuses.get(v_id))
         print(json.dumps(res))
         broadcast["Stream Bound"] = ""
         broadcasts.save()
@@ -124,6 +125,8 @@ def start_broadcasts(yt : YouTubeHelper, args : argparse.Namespace):
     
     num_to_schedule = len(data)
     print(f"{num_to_schedule} broadcasts will be started")
+    # the status is requested right before each start, since making a broadcast live
+    # can wait for its stream and a status looked up for all broadcasts up front would be stale
     for broadcast in data:
         l_id :str = broadcast["Livestream ID"]
         title : str = broadcast["Title"]
@@ -3,12 +3,22 @@ import json
 from datetime import datetime, timedelta, timezone
 from typing import Any, List
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import string
 import secrets
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from core.google_sheets import GoogleSheets
 from core.auth import Authentication
 
+# UTC timestamp format expected by the Zoom API
+ZOOM_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# shared session so that all Zoom API calls reuse pooled keep-alive connections
+_zoom_session = requests.Session()
+_zoom_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                            max_retries=Retry(total=3, backoff_factor=0.5)))
 
 def generate_password() -> str:
     alphabet = string.ascii_letters + string.digits
@@ -17,14 +27,14 @@ def generate_password() -> str:
 def delete_meeting(auth : Authentication, meeting_id : str) -> requests.Response:
     """delete a scheduled Zoom meeting
     """
-    resp = requests.delete(f"https://api.zoom.us/v2/meetings/{meeting_id}", headers=auth.zoom).json()
+    resp = _zoom_session.delete(f"https://api.zoom.us/v2/meetings/{meeting_id}", headers=auth.zoom).json()
     return resp
     
 
 def get_meeting(auth : Authentication, meeting_id : str) -> requests.Response:
     """get info of a scheduled Zoom meeting such as start_url
     """
-    resp = requests.get(f"https://api.zoom.us/v2/meetings/{meeting_id}", headers=auth.zoom).json()
+    resp = _zoom_session.get(f"https://api.zoom.us/v2/meetings/{meeting_id}", headers=auth.zoom).json()
     return resp
     
 
@@ -42,7 +52,7 @@ def schedule_zoom_meeting(auth : Authentication, title : str, password : str, st
     meeting_info = {
         "topic": title,
         "type": 2,
-        "start_time": start.astimezone(tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "start_time": start.astimezone(tz=timezone.utc).strftime(ZOOM_TIME_FORMAT),
         "timezone": "UTC",
         "duration": int((end - start).total_seconds() / 60.0),
         "password": password,
@@ -68,7 +78,7 @@ def schedule_zoom_meeting(auth : Authentication, title : str, password : str, st
         }
     }
 
-    zoom_info = requests.post(f"https://api.zoom.us/v2/users/{host}/meetings",
+    zoom_info = _zoom_session.post(f"https://api.zoom.us/v2/users/{host}/meetings",
             json=meeting_info, headers=auth.zoom).json()
     return zoom_info
 
@@ -98,24 +108,49 @@ def schedule_meetings(args : argparse.Namespace):
     use_dialin = True
     if args.disable_dialin:
         use_dialin = False
-    for i in range(num_to_schedule):
-        session : dict[str, Any] = sessions[i]
-        title = session["Session Title"]
-        track = tracks_dict[session["Track"]]
-        start = datetime.fromisoformat(session["DateTime Start"].replace('Z', '+00:00'))
-        end = datetime.fromisoformat(session["DateTime End"].replace('Z', '+00:00'))
-        start = start - timedelta(minutes=args.time_before)
-        end = end + timedelta(minutes=args.time_after)
-        room = track["Room Name"]
-        host = track["Zoom Host ID"]
-        password = generate_password()
-        print(f"\r\n{i+1}/{num_to_schedule}: {title} - {room} | {start} - {end} | {host}")
-        resp = schedule_zoom_meeting(auth, f"Session: {title}", password, start, end, "Conference Session for Hosts and Presenter", host, use_dialin=use_dialin)
-        print(f"\r\n{json.dumps(resp, indent=4)}")
-        session["Zoom Meeting ID"] = str(resp["id"])
-        session["Zoom Password"] = password
-        session["Zoom URL"] = resp["join_url"]
-        sessionsSheet.save()
+    # Zoom API calls are independent per session and run concurrently, while sheet updates
+    # and saves stay on this thread as the results come in
+    with ThreadPoolExecutor(max_workers=max(1, args.max_concurrent)) as executor:
+        futures = {}
+        for i in range(num_to_schedule):
+            session : dict[str, Any] = sessions[i]
+            title = session["Session Title"]
+            track = tracks_dict[session["Track"]]
+            start = datetime.fromisoformat(session["DateTime Start"].replace('Z', '+00:00'))
+            end = datetime.fromisoformat(session["DateTime End"].replace('Z', '+00:00'))
+            start = start - timedelta(minutes=args.time_before)
+            end = end + timedelta(minutes=args.time_after)
+            room = track["Room Name"]
+            host = track["Zoom Host ID"]
+            password = generate_password()
+            print(f"\r\n{i+1}/{num_to_schedule}: {title} - {room} | {start} - {end} | {host}")
+            future = executor.submit(schedule_zoom_meeting, auth, f"Session: {title}", password, start, end,
+                                     "Conference Session for Hosts and Presenter", host, use_dialin=use_dialin)
+            futures[future] = (session, password)
+
+        # a failed meeting must not lose the results of the others, so errors are
+        # collected and only reported once all successful meetings are saved
+        failed = []
+        for future in as_completed(futures):
+            session, password = futures[future]
+            title = session["Session Title"]
+            try:
+                resp = future.result()
+            except Exception as e:
+                print(f"\r\nERROR scheduling {title}: {e}")
+                failed.append(title)
+                continue
+            print(f"\r\n{title}:\r\n{json.dumps(resp, indent=4)}")
+            if "id" not in resp or "join_url" not in resp:
+                print(f"ERROR scheduling {title}: unexpected Zoom response")
+                failed.append(title)
+                continue
+            session["Zoom Meeting ID"] = str(resp["id"])
+            session["Zoom Password"] = password
+            session["Zoom URL"] = resp["join_url"]
+            sessionsSheet.save()
+    if len(failed) > 0:
+        raise RuntimeError(f"{len(failed)} of {num_to_schedule} meetings could not be scheduled: {failed}")
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Schedule zoom meetings')
@@ -125,6 +160,7 @@ if __name__ == '__main__':
     parser.add_argument('--start_url', action="store_true", help='retrieve start url of a meeting')
     
     parser.add_argument("--max_n_schedules", default=200, type=int, help='Maximum number of meetings to schedule in a call')
+    parser.add_argument("--max_concurrent", default=4, type=int, help='Maximum number of meetings scheduled concurrently')
     parser.add_argument("--time_before", default=15, type=int, help='Time to start meeting earlier than session time, in minutes')
     parser.add_argument("--time_after", default=5, type=int, help='Scheduled end time of meeting after official session end, in minutes')
 